@@ -1,11 +1,22 @@
 import boto3
+import hashlib
 import json
 import os
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 
-# Initialize the Polly client with a specific region
-polly_client = boto3.client('polly', region_name='us-west-2')
+# Constants
+SYNTHESIS_WORKERS = 64  # Parallel synthesize_speech + put_object calls
+
+# Shared client configuration: one pooled connection per synthesis thread and
+# adaptive retries so Polly throttling backs off instead of failing
+client_config = Config(max_pool_connections=SYNTHESIS_WORKERS, retries={'max_attempts': 10, 'mode': 'adaptive'})
+
+# Initialize the shared Polly client with a specific region; functions take an
+# optional polly_client argument and fall back to this one
+polly_client = boto3.client('polly', region_name='us-west-2', config=client_config)
 
 def load_input_data(file_path: str) -> List[Dict[str, Any]]:
     try:
@@ -28,8 +39,10 @@ def get_compatible_voices(language_code: str) -> List[str]:
 
 def generate_audio(text: str, voice_id: str, lang_code: str, polly_client=None) -> Optional[bytes]:
     try:
+        # Fall back to the shared module-level client instead of building one per call;
+        # look it up at call time so rebinding the module attribute takes effect
         if polly_client is None:
-            polly_client = boto3.client('polly', region_name='us-west-2')
+            polly_client = globals()['polly_client']
             
         response = polly_client.synthesize_speech(
             Text=text,
@@ -41,3 +54,67 @@ def generate_audio(text: str, voice_id: str, lang_code: str, polly_client=None)
     except (BotoCoreError, ClientError) as error:
         print(f"Error generating audio for voice {voice_id}: {error}")
         return None
+
+def get_synthesis_key(text: str, voice_id: str, lang_code: str) -> str:
+    """Content key identifying the audio Polly produces for (text, voice, language)"""
+    return hashlib.sha1(f"{text}|{voice_id}|{lang_code}".encode('utf-8')).hexdigest()
+
+def is_already_synthesized(s3_client, bucket: str, key: str, synthesis_key: str) -> bool:
+    """Check whether the object at key already holds the audio for synthesis_key"""
+    try:
+        response = s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError:
+        return False
+    return response.get('Metadata', {}).get('synthesis-key') == synthesis_key
+
+def get_output_key(job: Tuple[str, str, str, str], output_prefix: str) -> str:
+    """Return the S3 key the audio of a (word, lang_code, lang_name, voice) job is stored under"""
+    word, _, lang_name, voice = job
+    return f"{output_prefix}{word.replace(' ', '_')}_{lang_name}_{voice}.mp3"
+
+def synthesize_job_to_s3(job: Tuple[str, str, str, str], s3_client, output_bucket: str,
+                         output_prefix: str, polly_client=None) -> Optional[str]:
+    """Synthesize one (word, lang_code, lang_name, voice) job, upload it and return its S3 key"""
+    word, lang_code, _, voice = job
+    output_key = get_output_key(job, output_prefix)
+    
+    # Skip Polly entirely when a previous run already produced this exact audio
+    synthesis_key = get_synthesis_key(word, voice, lang_code)
+    if is_already_synthesized(s3_client, output_bucket, output_key, synthesis_key):
+        print(f"Reusing existing file: {output_key}")
+        return output_key
+        
+    print(f"Calling generate_audio with: text={word}, voice_id={voice}, lang_code={lang_code}")
+    audio_content = generate_audio(word, voice, lang_code, polly_client)
+    if not audio_content:
+        return None
+        
+    s3_client.put_object(
+        Bucket=output_bucket,
+        Key=output_key,
+        Body=audio_content,
+        Metadata={'synthesis-key': synthesis_key}
+    )
+    print(f"Generated file: {output_key}")
+    return output_key
+
+def synthesize_jobs_to_s3(jobs: List[Tuple[str, str, str, str]], s3_client, output_bucket: str,
+                          output_prefix: str, polly_client=None) -> List[str]:
+    """Synthesize and upload all jobs in parallel and return the generated S3 keys in job order"""
+    # Words like "a b" and "a_b" map to the same file; keep the first job per key so
+    # they don't overwrite each other's audio and synthesis-key on every run
+    unique_jobs = {}
+    for job in jobs:
+        output_key = get_output_key(job, output_prefix)
+        if output_key in unique_jobs:
+            print(f"Skipping {job[0]!r}: {output_key} is already produced for {unique_jobs[output_key][0]!r}")
+        else:
+            unique_jobs[output_key] = job
+            
+    # Synthesis and upload are network-bound, so threads overlap the round trips
+    with ThreadPoolExecutor(max_workers=SYNTHESIS_WORKERS) as executor:
+        output_keys = executor.map(
+            lambda job: synthesize_job_to_s3(job, s3_client, output_bucket, output_prefix, polly_client),
+            unique_jobs.values()
+        )
+        return [key for key in output_keys if key]
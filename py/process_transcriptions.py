@@ -2,36 +2,43 @@ import json
 import boto3
 import os
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Set
 
 def get_prefix_before_english(filename: str) -> str:
     """Extract the word prefix from the filename"""
-    parts = filename.split("_English")
-    if parts:
-        return parts[0]
-    return filename
+    # partition stops at the first match and returns the whole filename when absent
+    return filename.partition("_English")[0]
 
-def process_results(results: List[Dict[str, Any]], successful_dict: defaultdict) -> List[str]:
-    """Process a batch of results and return failed files"""
-    failed_files = []
-    
+def upload_json(s3_client, bucket: str, key: str, data: Any) -> None:
+    """Upload data to S3 as compact UTF-8 JSON"""
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(data, ensure_ascii=False).encode('utf-8')
+    )
+
+def process_results(results: List[Dict[str, Any]], successful_dict: defaultdict, failed_files: Set[str]) -> None:
+    """Process a batch of results, collecting failed files into the failed_files set"""
     if not results:
-        return failed_files
+        return
         
     for result in results:
         if 'body' in result:
             # Process successful transcriptions
             if 'completed' in result['body']:
+                # Reuse the current set when consecutive rows share a prefix
+                current_prefix, transcriptions = None, None
                 for filename, transcription in result['body']['completed'].items():
                     prefix = get_prefix_before_english(filename)
-                    successful_dict[prefix].add(transcription)
+                    if prefix != current_prefix:
+                        current_prefix, transcriptions = prefix, successful_dict[prefix]
+                    transcriptions.add(transcription)
             
             # Collect failed files
             if 'retryable_uris' in result['body']:
-                failed_files.extend(result['body']['retryable_uris'])
-                
-    return failed_files
+                failed_files.update(result['body']['retryable_uris'])
 
 def process_transcriptions(transcription_results: List[Dict], retry_results: List[Dict], 
                          output_bucket: str, output_prefix: str) -> Dict[str, Any]:
@@ -39,14 +46,15 @@ def process_transcriptions(transcription_results: List[Dict], retry_results: Lis
     
     # Create dictionary for successful transcriptions
     successful_dict = defaultdict(set)
-    failed_files = []
+    # A set dedupes failed files as they are collected
+    failed_files: Set[str] = set()
     
     # Process both initial and retry results
-    failed_files.extend(process_results(transcription_results, successful_dict))
-    failed_files.extend(process_results(retry_results, successful_dict))
+    process_results(transcription_results, successful_dict, failed_files)
+    process_results(retry_results, successful_dict, failed_files)
     
-    # Remove duplicates from failed files
-    failed_files = list(set(failed_files))
+    # Convert failed_files to a list for JSON serialization
+    failed_files = list(failed_files)
     
     # Convert successful_dict sets to lists for JSON serialization
     successful_dict = {prefix: list(transcriptions) 
@@ -55,25 +63,22 @@ def process_transcriptions(transcription_results: List[Dict], retry_results: Lis
     # Generate timestamps for filenames
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
-    # Save successful transcriptions
     success_key = f"{output_prefix}successful_transcriptions_{timestamp}.json"
+    failed_key = f"{output_prefix}failed_files_{timestamp}.json"
     s3_client = boto3.client('s3')
-    s3_client.put_object(
-        Bucket=output_bucket,
-        Key=success_key,
-        Body=json.dumps(successful_dict, indent=2, ensure_ascii=False)
-    )
     
-    # Save failed files list
-    failed_key = f"{output_prefix}failed_files_{timestamp}.json"
-    s3_client.put_object(
-        Bucket=output_bucket,
-        Key=failed_key,
-        Body=json.dumps({
-            'failed_files': failed_files,
-            'count': len(failed_files)
-        }, indent=2)
-    )
+    # Save successful transcriptions and failed files list concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        uploads = [
+            executor.submit(upload_json, s3_client, output_bucket, success_key, successful_dict),
+            executor.submit(upload_json, s3_client, output_bucket, failed_key, {
+                'failed_files': failed_files,
+                'count': len(failed_files)
+            })
+        ]
+        # Re-raise any upload error so lambda_handler reports it
+        for upload in uploads:
+            upload.result()
     
     return {
         'successful_file': success_key,
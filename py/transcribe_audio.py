@@ -1,37 +1,70 @@
 import os
 import json
 import boto3
+import random
 import time
-import urllib.request
 from datetime import datetime
-from multiprocessing import cpu_count
+from functools import lru_cache
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Tuple, Any
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple, Any, Optional
 
-# Initialize the S3 and Transcribe clients
-s3_client = boto3.client('s3', region_name='us-west-2')
-transcribe_client = boto3.client('transcribe', region_name='us-west-2')
+# Constants
+MAX_START_WORKERS = int(os.environ.get('MAX_START_WORKERS', '40'))  # Parallel start_transcription_job calls per Lambda
+POLL_INITIAL_DELAY = 1.0  # Seconds before the first status polling round
+POLL_MAX_DELAY = 30.0     # Upper bound on the backoff between polling rounds
+FAILED_RESULT_PREFIXES = ("Transcription failed", "Error")  # Status results that are not transcripts
+TERMINAL_JOB_STATUSES = frozenset({'COMPLETED', 'FAILED'})  # Job states that end polling
+
+# Configure the S3 and Transcribe clients with a connection pool large enough
+# for the start pool plus the poller (botocore defaults to 10 connections) and
+# adaptive retries so Transcribe throttling slows requests down client-side
+client_config = Config(
+    max_pool_connections=2 * MAX_START_WORKERS,
+    retries={'max_attempts': 10, 'mode': 'adaptive'}
+)
 
 # S3 bucket configuration
 BASE_BUCKET_NAME = 'voice-matching-zytest'
-TIMESTAMP = datetime.now().strftime('%Y%m%d_%H%M%S')
-S3_PREFIX = f"{TIMESTAMP}"
-S3_BUCKET_PATH = f"{BASE_BUCKET_NAME}/{S3_PREFIX}"
 
-# Constants
-MAX_WORKERS = 10  # Maximum number of parallel jobs per Lambda
+# Transcripts are written to our own bucket so they can be read back with the S3 client
+TRANSCRIPT_BUCKET = os.environ.get('OUTPUT_BUCKET', BASE_BUCKET_NAME)
+TRANSCRIPT_PREFIX = os.environ.get('OUTPUT_PREFIX', 'transcriptions/')
+
+@lru_cache(maxsize=1)
+def get_s3_client():
+    """Return the shared S3 client, creating it on first use rather than at import"""
+    return boto3.client('s3', region_name='us-west-2', config=client_config)
+
+@lru_cache(maxsize=1)
+def get_transcribe_client():
+    """Return the shared Transcribe client, creating it on first use rather than at import"""
+    return boto3.client('transcribe', region_name='us-west-2', config=client_config)
 
-def start_transcription_job(job_info: Tuple[str, str]) -> Tuple[str, str, str]:
-    """Start a transcription job and return tuple of (filename, job_name, status)"""
+def get_transcript_key(job_name: str) -> str:
+    """Return the S3 key Transcribe writes the transcript of job_name to"""
+    return f"{TRANSCRIPT_PREFIX}{job_name}.json"
+
+def start_transcription_job(job_info: Tuple[str, str], timestamp: Optional[str] = None,
+                            transcribe_client=None) -> Tuple[str, str, str]:
+    """Start a transcription job for the batch and return tuple of (filename, job_name, status)"""
     filename, file_uri = job_info
     try:
-        job_name = f"transcribe_job_{TIMESTAMP}_{filename.replace('.mp3', '')}"
+        # Batches pass their timestamp and client; standalone callers get fresh defaults
+        if timestamp is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if transcribe_client is None:
+            transcribe_client = get_transcribe_client()
+            
+        job_name = f"transcribe_job_{timestamp}_{filename.replace('.mp3', '')}"
         transcribe_client.start_transcription_job(
             TranscriptionJobName=job_name,
             Media={'MediaFileUri': file_uri},
             MediaFormat='mp3',
-            LanguageCode='en-US'
+            LanguageCode='en-US',
+            OutputBucketName=TRANSCRIPT_BUCKET,
+            OutputKey=get_transcript_key(job_name)
         )
         print(f"Started transcription job: {job_name}")
         return filename, job_name, "STARTED"
@@ -40,32 +73,83 @@ def start_transcription_job(job_info: Tuple[str, str]) -> Tuple[str, str, str]:
         print(f"Error starting transcription for {filename}: {error_msg}")
         return filename, "", error_msg
 
-def check_job_status(job_info: Tuple[str, str, str]) -> Tuple[str, str]:
-    """Check transcription job status and return tuple of (filename, transcript or status)"""
+def check_job_status_once(job_info: Tuple[str, str, str], transcribe_client=None,
+                          s3_client=None) -> Optional[Tuple[str, str]]:
+    """Check transcription job status once and return tuple of (filename, transcript or status), or None if still running"""
     filename, job_name, _ = job_info
     try:
-        while True:
-            status = transcribe_client.get_transcription_job(TranscriptionJobName=job_name)
-            job_status = status['TranscriptionJob']['TranscriptionJobStatus']
+        if transcribe_client is None:
+            transcribe_client = get_transcribe_client()
+        if s3_client is None:
+            s3_client = get_s3_client()
+            
+        job = transcribe_client.get_transcription_job(TranscriptionJobName=job_name)['TranscriptionJob']
+        job_status = job['TranscriptionJobStatus']
+        
+        # Most polls land on QUEUED/IN_PROGRESS, so leave before any other lookups
+        if job_status not in TERMINAL_JOB_STATUSES:
+            return None
             
-            if job_status == 'COMPLETED':
-                transcript_uri = status['TranscriptionJob']['Transcript']['TranscriptFileUri']
-                with urllib.request.urlopen(transcript_uri) as response:
-                    transcript_json = json.loads(response.read().decode('utf-8'))
-                    return filename, transcript_json['results']['transcripts'][0]['transcript']
-                    
-            elif job_status == 'FAILED':
-                error_msg = status['TranscriptionJob'].get('FailureReason', 'Unknown failure')
-                print(f"Transcription job failed for {filename}: {error_msg}")
-                return filename, f"Transcription failed: {error_msg}"
+        if job_status == 'COMPLETED':
+            # Read the transcript through the pooled S3 client instead of a fresh HTTPS connection
+            response = s3_client.get_object(Bucket=TRANSCRIPT_BUCKET, Key=get_transcript_key(job_name))
+            transcript_json = json.load(response['Body'])
+            return filename, transcript_json['results']['transcripts'][0]['transcript']
                 
-            time.sleep(5)
+        error_msg = job.get('FailureReason', 'Unknown failure')
+        print(f"Transcription job failed for {filename}: {error_msg}")
+        return filename, f"Transcription failed: {error_msg}"
             
     except Exception as e:
         error_msg = f"Error checking status: {str(e)}"
         print(f"Error getting transcription result for {filename}: {error_msg}")
         return filename, error_msg
 
+def check_job_status(job_info: Tuple[str, str, str], transcribe_client=None, s3_client=None) -> Tuple[str, str]:
+    """Wait for a single transcription job and return tuple of (filename, transcript or status)"""
+    delay = POLL_INITIAL_DELAY
+    while True:
+        result = check_job_status_once(job_info, transcribe_client, s3_client)
+        if result is not None:
+            return result
+        time.sleep(delay * random.uniform(0.8, 1.2))
+        delay = min(delay * 2, POLL_MAX_DELAY)
+
+def poll_transcription_jobs(job_futures: List[Future], transcribe_client,
+                            s3_client) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str]]]:
+    """Poll each job from a single thread as soon as it has started and return (start results, status results)"""
+    job_results = []
+    status_results = []
+    starting = set(job_futures)
+    pending = []
+    delay = POLL_INITIAL_DELAY
+    while starting or pending:
+        # Pick up newly started jobs, blocking only when there is nothing to poll yet
+        done, starting = wait(starting, timeout=0 if pending else None, return_when=FIRST_COMPLETED)
+        for future in done:
+            job_info = future.result()
+            job_results.append(job_info)
+            if job_info[2] == "STARTED":
+                pending.append(job_info)
+                # Short jobs finish quickly, so restart the backoff for fresh jobs
+                delay = POLL_INITIAL_DELAY
+        
+        still_running = []
+        for job in pending:
+            result = check_job_status_once(job, transcribe_client, s3_client)
+            if result is None:
+                still_running.append(job)
+            else:
+                status_results.append(result)
+        pending = still_running
+        
+        if pending:
+            # Exponential backoff with jitter so batches started together don't poll in lockstep
+            time.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, POLL_MAX_DELAY)
+            
+    return job_results, status_results
+
 def process_batch(s3_uris: List[str], is_retry: bool = False) -> Dict[str, Any]:
     """Process a batch of S3 URIs through the transcription pipeline"""
     results = {
@@ -91,33 +175,34 @@ def process_batch(s3_uris: List[str], is_retry: bool = False) -> Dict[str, Any]:
             print(f"Error processing URI {uri}: {str(e)}")
             continue
     
-    # Start transcription jobs in parallel
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        job_futures = [executor.submit(start_transcription_job, file_info) for file_info in file_infos]
-        job_results = [future.result() for future in as_completed(job_futures)]
+    # Map filenames back to their URIs for the retry list
+    uri_by_filename = dict(file_infos)
+    
+    # Create the clients here, on the calling thread: concurrent first calls from the
+    # pool threads would each build their own client from boto3's non-thread-safe
+    # default session instead of sharing one
+    transcribe_client = get_transcribe_client()
+    s3_client = get_s3_client()
+    
+    # Start transcription jobs in parallel and poll each one as soon as it has started
+    with ThreadPoolExecutor(max_workers=MAX_START_WORKERS) as executor:
+        job_futures = [executor.submit(start_transcription_job, file_info, results['timestamp'], transcribe_client)
+                       for file_info in file_infos]
+        job_results, status_results = poll_transcription_jobs(job_futures, transcribe_client, s3_client)
     
     # Process job start results
-    successful_jobs = []
     for filename, job_name, status in job_results:
-        if status == "STARTED":
-            successful_jobs.append((filename, job_name, status))
-        elif "limit exceeded" in str(status).lower() and not is_retry:
+        if "limit exceeded" in str(status).lower() and not is_retry:
             # 只有在非重试状态下才添加到重试列表
-            results['retryable_uris'].append(next(uri for fn, uri in file_infos if fn == filename))
+            results['retryable_uris'].append(uri_by_filename[filename])
     
-    if successful_jobs:
-        # Check job status and get transcriptions
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            status_futures = [executor.submit(check_job_status, job) for job in successful_jobs]
-            status_results = [future.result() for future in as_completed(status_futures)]
-        
-        # Process transcription results
-        for filename, result in status_results:
-            if "limit exceeded" in str(result).lower() and not is_retry:
-                # 找到对应的URI并添加到重试列表
-                results['retryable_uris'].append(next(uri for fn, uri in file_infos if fn == filename))
-            elif not result.startswith("Transcription failed") and not result.startswith("Error"):
-                results['completed'][filename] = result
+    # Process transcription results
+    for filename, result in status_results:
+        if "limit exceeded" in str(result).lower() and not is_retry:
+            # 找到对应的URI并添加到重试列表
+            results['retryable_uris'].append(uri_by_filename[filename])
+        elif not result.startswith(FAILED_RESULT_PREFIXES):
+            results['completed'][filename] = result
     
     return results
 